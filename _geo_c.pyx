@@ -0,0 +1,61 @@
+# cython: language_level=3
+'''
+Compiled batch kernels of the geo module.
+
+Built by setup.py as an optional extension. The functions work on
+contiguous float64 arrays (coordinates in degrees) and write into a
+preallocated output array. No range validation is done here, callers
+are expected to validate the input like geo._validate_vec() does.
+'''
+cimport cython
+from cython.parallel cimport prange
+from libc.math cimport sin, cos, asin, atan2, sqrt, fmod, fmin, M_PI
+
+cdef double R = 6371.0
+cdef double DEG = M_PI / 180.0
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+def haversine_batch(double[::1] lat1, double[::1] lon1,
+                    double[::1] lat2, double[::1] lon2, double[::1] out):
+    """ @brief Haversine distances in km between arrays of points.
+        @param {lat1/lon1} float64 array: Source points.
+        @param {lat2/lon2} float64 array: Destination points.
+        @param out float64 array: Output, same length as the inputs."""
+    cdef Py_ssize_t i, n = out.shape[0]
+    cdef double phi1, phi2, sLat, sLon, a
+    if lat1.shape[0] != n or lon1.shape[0] != n or lat2.shape[0] != n or lon2.shape[0] != n:
+        raise ValueError("All arrays must have the same length")
+
+    for i in prange(n, nogil=True):
+        phi1 = lat1[i] * DEG
+        phi2 = lat2[i] * DEG
+        sLat = sin((phi2 - phi1) * 0.5)
+        sLon = sin((lon2[i] - lon1[i]) * DEG * 0.5)
+        a = fmin(sLat * sLat + cos(phi1) * cos(phi2) * sLon * sLon, 1.0)
+        out[i] = 2.0 * R * asin(sqrt(a))
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+def initial_bearing_batch(double[::1] lat1, double[::1] lon1,
+                          double[::1] lat2, double[::1] lon2, double[::1] out):
+    """ @brief Initial bearings in degrees (0-360) between arrays of points.
+        @param {lat1/lon1} float64 array: Source points.
+        @param {lat2/lon2} float64 array: Destination points.
+        @param out float64 array: Output, same length as the inputs."""
+    cdef Py_ssize_t i, n = out.shape[0]
+    cdef double phi1, phi2, dl, cp2, y, x
+    if lat1.shape[0] != n or lon1.shape[0] != n or lat2.shape[0] != n or lon2.shape[0] != n:
+        raise ValueError("All arrays must have the same length")
+
+    #sin/cos pairs of the same angle are merged into one sincos() call by GCC.
+    for i in prange(n, nogil=True):
+        phi1 = lat1[i] * DEG
+        phi2 = lat2[i] * DEG
+        dl = (lon2[i] - lon1[i]) * DEG
+        cp2 = cos(phi2)
+        y = sin(dl) * cp2
+        x = cos(phi1) * sin(phi2) - sin(phi1) * cp2 * cos(dl)
+        out[i] = fmod(atan2(y, x) / DEG + 360.0, 360.0)
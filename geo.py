@@ -4,10 +4,30 @@ Created on Jul 19, 2012
 @author: bartek
 @version: 1.0.0
 @contact: bartlomiej.grabowski@tlen.pl
-@requires: Python in version 2.6 and upper.
+@requires: Python in version 3.8 and upper; NumPy for the batch functions,
+           Numba and Cython (_geo_c) optionally for speed.
 '''
 import math
-import sys
+import warnings
+#Kernels below use these directly: cheaper than a math.<name> lookup in plain Python.
+from math import acos, asin, atan2, cos, degrees, fabs, floor, log, nan, radians, sin, sqrt, tan
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    from numba import njit, vectorize, prange
+except ImportError:
+    njit = None
+    vectorize = None
+    prange = range
+
+try:
+    import _geo_c
+except ImportError:
+    _geo_c = None
 
 
 class LatitudeRangeException(Exception):
@@ -20,9 +40,366 @@ class LongitudeRangeException(Exception):
     def __init__(self, message):
         self.message = message
         
+#Mean earth radius in km.
+_R = 6371.0
+_INV_R = 1.0/_R
+_PI = math.pi
+_TWO_PI = 2.0*math.pi
+_INV_TWO_PI = 0.5/math.pi
+_PI_2 = 0.5*math.pi
+_PI_4 = 0.25*math.pi
+
+#Flags used for the compiled kernels. 'nnan' and 'ninf' are left out on purpose:
+#_intersection() returns NaN as its "no intersection" marker and the domain checks
+#in _unit()/_positive() must see NaN and infinite values, these flags would let
+#the compiler assume they never occur.
+#'contract' (fused multiply-add) breaks the exact zero tests in _intersection().
+_FASTMATH = set(['nsz', 'arcp', 'afn', 'reassoc'])
+
+def _jit(signature, parallel=False):
+    """ @brief Compiles a kernel with Numba, when it is available.
+        Kernels are compiled eagerly for the given signature, so the (cached)
+        compilation happens on import and not on the first call.
+        @param signature str: Numba signature of the kernel.
+        @param parallel bool: Split the prange loops of the kernel over all cores."""
+    if njit is None:
+        return lambda func: func
+    return njit(signature, parallel=parallel, cache=True, fastmath=_FASTMATH)
+
+@_jit('f8(f8)')
+def _wrap_pi(x):
+    """Normalizes an angle in radians to [-pi, pi), like (x + pi) % 2pi - pi
+       but with a multiplication and floor instead of the slower float modulo.
+       math.remainder() would do the same, but Numba does not support it."""
+    return x - _TWO_PI * floor(x * _INV_TWO_PI + 0.5)
+
+def _wrap_pi_vec(x):
+    """Array version of _wrap_pi() for the batch functions."""
+    return x - _TWO_PI * np.floor(x * _INV_TWO_PI + 0.5)
+
+@_jit('f8(f8)')
+def _unit(x):
+    """Returns x when it is a valid asin()/acos() argument, raises ValueError otherwise.
+       Compiled code returns NaN where the math module raises, this keeps both the same."""
+    if not (-1.0 <= x <= 1.0):
+        raise ValueError("math domain error")
+    return x
+
+@_jit('f8(f8)')
+def _positive(x):
+    """Returns x when it is a valid log() argument, raises ValueError otherwise, see _unit()."""
+    if not x > 0.0:
+        raise ValueError("math domain error")
+    return x
+
+@_jit('f8(f8, f8, f8, f8)')
+def _haversine(lat1, lon1, lat2, lon2):
+    """Haversine distance in km, see Geo.distance_haversine()."""
+    phi1 = radians(lat1)
+    phi2 = radians(lat2)
+    sLat = sin((phi2 - phi1)*0.5)
+    sLon = sin(radians(lon2 - lon1)*0.5)
+
+    #Rounding may push a slightly above 1 for antipodal points.
+    a = min(sLat * sLat + cos(phi1) * cos(phi2) * sLon * sLon, 1.0)
+    c = 2 * atan2(sqrt(a), sqrt(1.0 - a))
+    return _R * c
+
+@_jit('f8(f8, f8, f8, f8)')
+def _sloc(lat1, lon1, lat2, lon2):
+    """Spherical law of cosines distance in km, see Geo.distance_sloc()."""
+    phi1 = radians(lat1)
+    phi2 = radians(lat2)
+    dl = radians(lon2 - lon1)
+    sp1 = sin(phi1)
+    cp1 = cos(phi1)
+    sp2 = sin(phi2)
+    cp2 = cos(phi2)
+    cdl = cos(dl)
+
+    #atan2 form (Vincenty's formula on a sphere) instead of acos(c), which loses
+    #precision for short distances and fails when rounding pushes c above 1.
+    a = cp2 * sin(dl)
+    b = cp1 * sp2 - sp1 * cp2 * cdl
+    c = sp1 * sp2 + cp1 * cp2 * cdl
+    return _R * atan2(sqrt(a * a + b * b), c)
+
+@_jit('f8(f8, f8, f8)')
+def _fwd_az(phi1, phi2, dl):
+    """Forward azimuth in radians (-pi .. pi) from latitude phi1 to latitude phi2
+       over longitude difference dl, all in radians."""
+    cp2 = cos(phi2)
+    y = sin(dl) * cp2
+    x = cos(phi1) * sin(phi2) - sin(phi1) * cp2 * cos(dl)
+    return atan2(y, x)
+
+@_jit('f8(f8, f8, f8, f8)')
+def _initial_bearing(lat1, lon1, lat2, lon2):
+    """Initial bearing in degrees (0-360), see Geo.initial_bearing()."""
+    brng = _fwd_az(radians(lat1), radians(lat2), radians(lon2 - lon1))
+    #Since atan2 returns values in the range -pi ... +pi (that is, -180 ... +180),
+    #to normalize the result to a compass bearing (in the range 0 ... 360...
+    return (degrees(brng) + 360) % 360
+
+@_jit('f8(f8, f8, f8, f8)')
+def _final_bearing(lat1, lon1, lat2, lon2):
+    """Final bearing in degrees (0-360), see Geo.final_bearing()."""
+    #Reverse of the initial bearing from the destination back to the source.
+    brng = _fwd_az(radians(lat2), radians(lat1), radians(lon1 - lon2))
+    return (degrees(brng) + 180) % 360
+
+@_jit('UniTuple(f8, 2)(f8, f8, f8, f8)')
+def _midpoint(lat1, lon1, lat2, lon2):
+    """Great circle midpoint in degrees, see Geo.midpoint()."""
+    lat1 = radians(lat1)
+    lon1 = radians(lon1)
+    lat2 = radians(lat2)
+    lon2 = radians(lon2)
+
+    dLon = lon2 - lon1
+    cLat2 = cos(lat2)
+    bx = cLat2 * cos(dLon)
+    by = cLat2 * sin(dLon)
+    cx = cos(lat1) + bx
+
+    mLat = atan2(sin(lat1) + sin(lat2), sqrt(cx * cx + by * by))
+    mLon = lon1 + atan2(by, cx)
+    return (degrees(mLat), degrees(mLon))
+
+@_jit('UniTuple(f8, 2)(f8, f8, f8, f8, f8, f8)')
+def _intersection(lat1, lon1, brng1, lat2, lon2, brng2):
+    """Intersection of two paths in degrees, see Geo.intersection().
+       Returns (nan, nan) when there is no unique intersection."""
+    lat1 = radians(lat1)
+    lon1 = radians(lon1)
+    lat2 = radians(lat2)
+    lon2 = radians(lon2)
+
+    dLat = lat2 - lat1
+    dLon = lon2 - lon1
+
+    brng1 = radians(brng1)
+    brng2 = radians(brng2)
+
+    sp1 = sin(lat1)
+    cp1 = cos(lat1)
+    sp2 = sin(lat2)
+    cp2 = cos(lat2)
+
+    sLat = sin(dLat*0.5)
+    sLon = sin(dLon*0.5)
+    d = 2 * asin(sqrt(min(sLat * sLat + cp1 * cp2 * sLon * sLon, 1.0)))
+
+    if d == 0:
+        return (nan, nan)
+
+    sd = sin(d)
+    cd = cos(d)
+
+    #Protect against rounding.
+    f1 = acos(min(max((sp2 - sp1 * cd) / (sd * cp1), -1.0), 1.0))
+
+    f2 = acos(_unit((sp1 - sp2 * cd) / (sd * cp2)))
+
+    if sin(dLon) > 0:
+        b1 = f1
+        b2 = _TWO_PI - f2
+    else:
+        b1 = _TWO_PI - f1
+        b2 = f2
+
+    a1 = _wrap_pi(brng1 - b1)
+    a2 = _wrap_pi(b2 - brng2)
+
+    sa1 = sin(a1)
+    sa2 = sin(a2)
+
+    #Infinite intersections.
+    if sa1 == 0 and sa2 == 0:
+        return (nan, nan)
+
+    #Ambiguous intersection.
+    if sa1 * sa2 < 0:
+        return (nan, nan)
+
+    ca1 = cos(a1)
+    ca2 = cos(a2)
+
+    a3 = acos(_unit(-ca1 * ca2 + sa1 * sa2 * cd))
+
+    dx = atan2(sd * sa1 * sa2, ca2 + ca1 * cos(a3))
+    sdx = sin(dx)
+    cdx = cos(dx)
+
+    lat3 = asin(_unit(sp1 * cdx + cp1 * sdx * cos(brng1)))
+
+    dLon13 = atan2(sin(brng1) * sdx * cp1, cdx - sp1 * sin(lat3))
+
+    #Normalise to -180...+180.
+    lon3 = _wrap_pi(lon1 + dLon13)
+    return (degrees(lat3), degrees(lon3))
+
+@_jit('f8(f8, f8, f8, f8)')
+def _rhumb_distance(lat1, lon1, lat2, lon2):
+    """Rhumb line distance in km, see Geo.rhumb_distance()."""
+    lat1 = radians(lat1)
+    lat2 = radians(lat2)
+    lon1 = radians(lon1)
+    lon2 = radians(lon2)
+
+    dLat = lat2 - lat1
+    dLon = fabs(lon2 - lon1)
+
+    dPhi = log(_positive(tan(lat2*0.5 + _PI_4)/tan(lat1*0.5 + _PI_4)))
+    #E-W line gives dPhi=0.
+    if dPhi == 0.0:
+        q = cos(lat1)
+    else:
+        q = dLat/dPhi
+
+    #If dLon over 180 take shorter rhumb across 180 meridian.
+    #dLon is not negative here and only its square is used below.
+    if dLon > _PI:
+        dLon = _TWO_PI - dLon
+
+    return sqrt(dLat * dLat + q * q * dLon * dLon) * _R
+
+@_jit('f8(f8, f8, f8, f8)')
+def _rhumb_bearing(lat1, lon1, lat2, lon2):
+    """Rhumb line bearing in degrees, see Geo.rhumb_bearing()."""
+    lat1 = radians(lat1)
+    lat2 = radians(lat2)
+    lon1 = radians(lon1)
+    lon2 = radians(lon2)
+
+    dLon = lon2 - lon1
+    dPhi = log(_positive(tan(lat2*0.5 + _PI_4)/tan(lat1*0.5 + _PI_4)))
+
+    #E-W line gives dPhi=0.
+    if fabs(dLon) > _PI:
+        if dLon > 0:
+            dLon = -(_TWO_PI - dLon)
+        else:
+            dLon = _TWO_PI + dLon
+
+    brng = atan2(dLon, dPhi)
+    return (degrees(brng) + 360) % 360
+
+@_jit('UniTuple(f8, 2)(f8, f8, f8, f8)')
+def _rhumb_destination_point(lat1, lon1, brng, dist):
+    """Rhumb line destination point in degrees, see Geo.rhumb_destination_point()."""
+    #Angular distance covered on earth's surface.
+    d = dist * _INV_R
+    lat1 = radians(lat1)
+    lon1 = radians(lon1)
+    brng = radians(brng)
+
+    lat2 = lat1 + d * cos(brng)
+    dLat = lat2 - lat1
+
+    dPhi = log(_positive(tan(lat2*0.5 + _PI_4)/tan(lat1*0.5 + _PI_4)))
+
+    #E-W line gives dPhi=0.
+    if dPhi == 0.0:
+        q = cos(lat1)
+    else:
+        q = dLat/dPhi
+
+    dLon = d * sin(brng)/q
+    if fabs(lat2) > _PI_2:
+        if lat2 > 0:
+            lat2 = _PI - lat2
+        else:
+            lat2 = -_PI - lat2
+
+    lon2 = _wrap_pi(lon1 + dLon)
+    return (degrees(lat2), degrees(lon2))
+
+@_jit('UniTuple(f8, 2)(f8, f8, f8, f8)')
+def _rhumb_midpoint(lat1, lon1, lat2, lon2):
+    """Rhumb line midpoint in degrees, see Geo.rhumb_midpoint()."""
+    lat1 = radians(lat1)
+    lat2 = radians(lat2)
+    lon1 = radians(lon1)
+    lon2 = radians(lon2)
+
+    lat3 = (lat2 + lat1)*0.5
+    f1 = tan(_PI_4 + lat1*0.5)
+    f2 = tan(_PI_4 + lat2*0.5)
+    f3 = tan(_PI_4 + lat3*0.5)
+
+    lf1 = log(_positive(f1))
+    lf2 = log(_positive(f2))
+
+    #E-W line gives lf1 == lf2.
+    if lf1 == lf2:
+        lon3 = (lon1 + lon2)*0.5
+    else:
+        lon3 = ((lon2 - lon1) * log(f3) + lon1 * lf2 - lon2 * lf1) / (lf2 - lf1)
+
+    #Normalize to -180 .. 180.
+    lon3 = _wrap_pi(lon3)
+    return (degrees(lat3), degrees(lon3))
+
+@_jit('UniTuple(f8, 2)(f8, f8, f8, f8)')
+def _destination_point(lat1, lon1, brng, dist):
+    """Great circle destination point in degrees, see Geo.destination_point()."""
+    #Convert distance to angular distance in radians.
+    dist = dist * _INV_R
+    lat1 = radians(lat1)
+    lon1 = radians(lon1)
+    brng = radians(brng)
+
+    sp1 = sin(lat1)
+    cp1 = cos(lat1)
+    sd = sin(dist)
+    cd = cos(dist)
+
+    lat2 = asin(_unit(sp1 * cd + cp1 * sd * cos(brng)))
+    lon2 = lon1 + atan2(sin(brng) * sd * cp1, cd - sp1 * sin(lat2))
+    #Normalize to -180 .. 180.
+    lon2 = _wrap_pi(lon2)
+    return (degrees(lat2), degrees(lon2))
+
+def _ufunc(kernel, target):
+    """ @brief Wraps a four argument scalar kernel into a NumPy ufunc.
+        With Numba the ufunc is compiled (and cached) for the given target ('cpu'
+        or 'parallel'), without it the kernel is wrapped by numpy.vectorize().
+        @param kernel function: Module level scalar kernel taking four floats.
+        @param target str: Numba vectorize target.
+        @return ufunc, or a function raising ImportError when NumPy is not installed."""
+    if vectorize is not None:
+        return vectorize(['f8(f8, f8, f8, f8)'], target=target, cache=True, \
+                         fastmath=_FASTMATH)(kernel)
+    if np is not None:
+        return np.vectorize(kernel, otypes=[np.float64])
+    def missing(*args):
+        _require_numpy()
+    return missing
+
+def _haversine_u(lat1, lon1, lat2, lon2):
+    """Body of the haversine ufuncs, a plain function so Numba can cache them."""
+    return _haversine(lat1, lon1, lat2, lon2)
+
+#Ufuncs spread over all cores, for large arrays.
+_haversine_ufunc = _ufunc(_haversine_u, 'parallel')
+#Single threaded ufuncs, for small arrays where the thread pool costs more than it gives.
+_haversine_ufunc_cpu = _ufunc(_haversine_u, 'cpu')
+
+@_jit('void(f8[:], f8[:], f8[:], f8[:], f8[:])', parallel=True)
+def _haversine_parallel(lat1, lon1, lat2, lon2, out):
+    """ @brief Haversine distances in km of 1-D float64 arrays, written into out.
+        With Numba the loop is split over all cores."""
+    for i in prange(lat1.size):
+        out[i] = _haversine(lat1[i], lon1[i], lat2[i], lon2[i])
+
 class Geo(object):
-    """Geo class provides a set of methods to calculating some geo-based parameters using 
-        Python's built-in math library."""
+    """Geo class provides a set of methods to calculating some geo-based parameters using
+        Python's built-in math library. The computations are compiled with Numba
+        when it is installed.
+        Degenerate input (e.g. a rhumb line from or to the south pole) is not hidden:
+        the methods raise ValueError or ZeroDivisionError, with or without Numba,
+        which is left to the caller."""
 
 
     def __init__(self):
@@ -30,408 +407,543 @@ class Geo(object):
         Constructor
         '''
         pass
-    
+
+    @staticmethod
+    def _validate_coords(lat1, lon1, lat2=None, lon2=None):
+        """ @brief Range check of the source and (optional) destination point.
+            @param {lat1/lon1} float: Source point.
+            @param {lat2/lon2} float: Destination point, skipped when None."""
+        if not (-90 <= lat1 <= 90 and (lat2 is None or -90 <= lat2 <= 90)):
+            raise LatitudeRangeException("Latitude exceeds the range (-90 .. 90)")
+        if not (-180 <= lon1 <= 180 and (lon2 is None or -180 <= lon2 <= 180)):
+            raise LongitudeRangeException("Longitude exceeds the range (-180 .. 180)")
+
+    #Haversine distance (km) as a ufunc over arrays of coordinates in degrees,
+    #e.g. Geo.distance_haversine_ufunc(lats1, lons1, lats2, lons2).
+    #No range validation is done, see distance_haversine_vec() for a checked version.
+    distance_haversine_ufunc = staticmethod(_haversine_ufunc)
+    distance_haversine_ufunc_cpu = staticmethod(_haversine_ufunc_cpu)
+
+    @staticmethod
+    def distance_haversine_parallel(lat1, lon1, lat2, lon2):
+        """ @brief Compute distances in km between arrays of points using haversine
+            formula, with the loop split over all CPU cores (needs Numba, otherwise
+            it runs as a plain Python loop). Worth it for large arrays only: the first
+            call starts the thread pool, and every call pays the cost of waking the
+            threads up.
+            @param {lat1/lon1} array_like: Source points.
+            @param {lat2/lon2} array_like: Destination points.
+            @return ndarray Distances between source and destination points. """
+        _require_numpy()
+        lat1, lon1, lat2, lon2 = np.broadcast_arrays(*[np.asarray(v, dtype=np.float64) \
+                                                       for v in (lat1, lon1, lat2, lon2)])
+        _validate_vec(lat1, lon1)
+        _validate_vec(lat2, lon2)
+
+        out = np.empty(lat1.shape)
+        _haversine_parallel(np.ravel(lat1), np.ravel(lon1), np.ravel(lat2), np.ravel(lon2), \
+                            out.reshape(-1))
+        #[()] turns the 0-d result of scalar inputs into a NumPy scalar, like distance_haversine_vec().
+        return out[()]
+
     def distance_haversine(self, lat1, lon1, lat2, lon2):
         """ @brief Compute distance between two points in km using haversine formula.
             @param {lat1/lon1} float: Source point.
             @param {lat2/lon2} float: Destination point.
             @return float Distance between source and destination point. """
-        R = 6371.0
-        
-        if (lat1 > 90 or lat1 < -90) or (lat2 > 90 or lat2 < -90):
-            raise LatitudeRangeException("Latitude exceeds the range (-90 .. 90)")
-        if (lon1 > 180 or lon1 < -180) or (lon2 > 180 or lon2 < -180):
-            raise LongitudeRangeException("Longitude exceeds the range (-180 .. 180)")
-        
-        try:
-            Lat = math.radians(lat2 - lat1)
-            Lon = math.radians(lon2 - lon1)
-            
-            a = math.sin(Lat/2.0) * math.sin(Lat/2.0) + \
-                math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * \
-                math.sin(Lon/2.0) * math.sin(Lon/2.0)
-            c = 2 * math.atan2(math.sqrt(a), math.sqrt(1.0 - a))
-        except Exception as ex:
-            sys.stderr.write('ERROR: %s\n' % str(ex))
-            return 1
-        
-        return (R * c)
-    
+        self._validate_coords(lat1, lon1, lat2, lon2)
+
+        return _haversine(float(lat1), float(lon1), float(lat2), float(lon2))
+
     def distance_sloc(self, lat1, lon1, lat2, lon2):
         """ @brief Compute distance between two points in km using
-            spherical law of cosines formula.
+            spherical law of cosines formula (evaluated in the atan2 form
+            of Vincenty's formula, accurate for short distances too).
             @param {lat1/lon1} float: Source point.
             @param {lat2/lon2} float: Destination point.
             @return float Distance between source and destination point. """
-        R = 6371.0
-        
-        if (lat1 > 90 or lat1 < -90) or (lat2 > 90 or lat2 < -90):
-            raise LatitudeRangeException("Latitude exceeds the range (-90 .. 90)")
-        if (lon1 > 180 or lon1 < -180) or (lon2 > 180 or lon2 < -180):
-            raise LongitudeRangeException("Longitude exceeds the range (-180 .. 180)")
-        try:
-            c = math.acos(math.sin(math.radians(lat1)) * math.sin(math.radians(lat2)) + \
-                          math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * \
-                          math.cos(math.radians(lon2 - lon1)))
-        except Exception as ex:
-            sys.stderr.write('ERROR: %s\n' % str(ex))
-            return 1
-         
-        return (R * c)
-    
+        self._validate_coords(lat1, lon1, lat2, lon2)
+        return _sloc(float(lat1), float(lon1), float(lat2), float(lon2))
+
     def initial_bearing(self, lat1, lon1, lat2, lon2):
         """ @brief Bearing from one point to another in degrees (0-360).
             @param {lat1/lon1} float: Source point.
             @param {lat2/lon2} float: Destination point.
             @return float Initial bearing between two points."""
-        if (lat1 > 90 or lat1 < -90) or (lat2 > 90 or lat2 < -90):
-            raise LatitudeRangeException("Latitude exceeds the range (-90 .. 90)")
-        if (lon1 > 180 or lon1 < -180) or (lon2 > 180 or lon2 < -180):
-            raise LongitudeRangeException("Longitude exceeds the range (-180 .. 180)")
-        
-        try:
-            lat1 = math.radians(lat1)
-            lat2 = math.radians(lat2)
-            lon1 = math.radians(lon1)
-            lon2 = math.radians(lon2)
-            dLon = lon2 - lon1
-            
-            y = math.sin(dLon) * math.cos(lat2)
-            x = math.cos(lat1) * math.sin(lat2) - math.sin(lat1) * \
-                math.cos(lat2) * math.cos(dLon)
-            brng = math.atan2(y, x)
-        except Exception as ex:
-            sys.stderr.write('ERROR: %s\n' % str(ex))
-            return 1 
-        #Since atan2 returns values in the range -pi ... +pi (that is, -180 ... +180), 
-        #to normalize the result to a compass bearing (in the range 0 ... 360...    
-        return (math.degrees(brng) + 360) % 360
-    
+        self._validate_coords(lat1, lon1, lat2, lon2)
+
+        return _initial_bearing(float(lat1), float(lon1), float(lat2), float(lon2))
+
     def final_bearing(self, lat1, lon1, lat2, lon2):
-        """ @brief Bearing from one point to another in degrees (0-360).
+        """ @brief Bearing at the destination point, when arriving along the great
+            circle from the source point, in degrees (0-360).
             @param {lat1/lon1} float: Source point.
             @param {lat2/lon2} float: Destination point.
             @return float Final bearing between two points."""
-        if (lat1 > 90 or lat1 < -90) or (lat2 > 90 or lat2 < -90):
-            raise LatitudeRangeException("Latitude exceeds the range (-90 .. 90)")
-        if (lon1 > 180 or lon1 < -180) or (lon2 > 180 or lon2 < -180):
-            raise LongitudeRangeException("Longitude exceeds the range (-180 .. 180)")
-        
-        try:
-            lat1 = math.radians(lat1)
-            lat2 = math.radians(lat2)
-            lon1 = math.radians(lon1)
-            lon2 = math.radians(lon2)
-            dLon = lon2 - lon1
-            
-            y = math.sin(dLon) * math.cos(lat2)
-            x = math.cos(lat1) * math.sin(lat2) - math.sin(lat1) * \
-                math.cos(lat2) * math.cos(dLon)
-            brng = math.atan2(y, x)
-        except Exception as ex:
-            sys.stderr.write('ERROR: %s\n' % str(ex))
-            return 1 
-        #Since atan2 returns values in the range -pi ... +pi (that is, -180 ... +180), 
-        #to normalize the result to a compass bearing (in the range 0 ... 360...    
-        return (math.degrees(brng) + 180) % 360
-    
+        self._validate_coords(lat1, lon1, lat2, lon2)
+
+        return _final_bearing(float(lat1), float(lon1), float(lat2), float(lon2))
+
     def midpoint(self, lat1, lon1, lat2, lon2):
         """ @brief This is the half-way point along a great circle
             path between the two points.
             @param {lat1/lon1} float: Source point.
             @param {lat2/lon2} float: Destination point.
-            @return {lat3/lon3} float: Midpoint coordinates."""
-        if (lat1 > 90 or lat1 < -90) or (lat2 > 90 or lat2 < -90):
-            raise LatitudeRangeException("Latitude exceeds the range (-90 .. 90)")
-        if (lon1 > 180 or lon1 < -180) or (lon2 > 180 or lon2 < -180):
-            raise LongitudeRangeException("Longitude exceeds the range (-180 .. 180)")
-        
-        try:
-            lat1 = math.radians(lat1)
-            lon1 = math.radians(lon1)
-            lat2 = math.radians(lat2)
-            lon2 = math.radians(lon2)
-            
-            bx = math.cos(lat2) * math.cos(lon2 - lon1)
-            by = math.cos(lat2) * math.sin(lon2 - lon1)
-            
-            mLat = math.atan2(math.sin(lat1) + math.sin(lat2), \
-                            math.sqrt((math.cos(lat1) + bx) * \
-                            (math.cos(lat1) + bx) + by * by))
-            mLon = lon1 + math.atan2(by, math.cos(lat1) + bx)
-        except Exception as ex:
-            sys.stderr.write('ERROR: %s\n' % str(ex))
-            return 1   
-        
-        return [round(math.degrees(mLat), 2), round(math.degrees(mLon), 2)]
-    
+            @return {lat3/lon3} tuple: Midpoint coordinates."""
+        self._validate_coords(lat1, lon1, lat2, lon2)
+
+        return _midpoint(float(lat1), float(lon1), float(lat2), float(lon2))
+
     def intersection(self, lat1, lon1, brng1, lat2, lon2, brng2):
         """ @brief Intersection of two paths given start points and bearings.
             @param {lat1/lon1} float: Source point.
             @param brng1 float: Initial bearing from source point.
             @param {lat2/lon2} float: Destination point.
             @param brng2 float: Initial bearing from destination point.
-            @return {lat3/lon3} float: Point of intersection of two path defined by point and bearing."""
-        if (lat1 > 90 or lat1 < -90) or (lat2 > 90 or lat2 < -90):
-            raise LatitudeRangeException("Latitude exceeds the range (-90 .. 90)")
-        if (lon1 > 180 or lon1 < -180) or (lon2 > 180 or lon2 < -180):
-            raise LongitudeRangeException("Longitude exceeds the range (-180 .. 180)")
-        
-        try: 
-            lat1 = math.radians(lat1)
-            lon1 = math.radians(lon1)
-            lat2 = math.radians(lat2)
-            lon2 = math.radians(lon2)
-            
-            dLat = lat2 - lat1
-            dLon = lon2 - lon1
-            
-            brng1 = math.radians(brng1)
-            brng2 = math.radians(brng2)
-            
-            d = 2 * math.asin(math.sqrt(math.sin(dLat/2) * math.sin(dLat/2) + \
-                           math.cos(lat1) * math.cos(lat2) * \
-                           math.sin(dLon/2) * math.sin(dLon/2)))
-            
-            if d == 0:
-                return 0
-            
-            f1 = math.acos((math.sin(lat2) - math.sin(lat1) * math.cos(d)) / (math.sin(d) * math.cos(lat1)))
-            
-            #Protect against rounding.
-            if math.isnan(f1):
-                f1 = 0
-                
-            f2 = math.acos((math.sin(lat1) - math.sin(lat2) * math.cos(d)) / (math.sin(d) * math.cos(lat2)))
-            
-            if math.sin(lon2 - lon1) > 0:
-                b1 = f1
-                b2 = 2 * math.pi - f2
-            else:
-                b1 = 2 * math.pi - f1
-                b2 = f2
-                
-            a1 = (brng1 - b1 + math.pi) % (2 * math.pi) - math.pi
-            a2 = (b2 - brng2 + math.pi) % (2 * math.pi) - math.pi
-            
-            #Infinite intersections.
-            if math.sin(a1) == 0 and math.sin(a2) == 0:
-                return 0
-            
-            #Ambiguous intersection.
-            if math.sin(a1) * math.sin(a2) < 0:
-                return 0
-            
-            a3 = math.acos(-math.cos(a1) * math.cos(a2) + math.sin(a1) * math.sin(a2) * \
-                           math.cos(d))
-            
-            dx = math.atan2(math.sin(d) * math.sin(a1) * math.sin(a2), \
-                            math.cos(a2) + math.cos(a1) * math.cos(a3))
-            
-            lat3 = math.asin(math.sin(lat1) * math.cos(dx) + math.cos(lat1) * \
-                             math.sin(dx) * math.cos(brng1))
-            
-            dLon13 = math.atan2(math.sin(brng1) * math.sin(dx) * math.cos(lat1), \
-                                math.cos(dx) - math.sin(lat1) * math.sin(lat3))
-            
-            #lon3 = lon1 + dLon13
-            #Normalise to -180...+180.
-            #lon3 = (lon3 +3 * math.pi) % (2 * math.pi) - math.pi
-            lon3 = (lon1 + dLon13 + math.pi) % (2 * math.pi) - math.pi
-        except Exception as ex:
-            sys.stderr.write('ERROR: %s\n' % str(ex))
-            return 1 
-        return [math.degrees(lat3), math.degrees(lon3)]
-    
+            @return {lat3/lon3} tuple: Point of intersection of two path defined by point and bearing,
+                (nan, nan) when there is no unique intersection (same start points, infinite
+                or ambiguous intersection), like intersection_vec()."""
+        self._validate_coords(lat1, lon1, lat2, lon2)
+
+        return _intersection(float(lat1), float(lon1), float(brng1), \
+                             float(lat2), float(lon2), float(brng2))
+
     def rhumb_distance(self, lat1, lon1, lat2, lon2):
-        """ @brief Returns the distance from point to the supplied point, 
+        """ @brief Returns the distance from point to the supplied point,
             in km, traveling along a rhumb line.
             @param {lat1/lon1} float: Source point.
             @param {lat2/lon2} float: Destination point
             @return distance float: Returns distance traveling along rhumb line."""
-        R = 6371.0
-        
-        if (lat1 > 90 or lat1 < -90) or (lat2 > 90 or lat2 < -90):
-            raise LatitudeRangeException("Latitude exceeds the range (-90 .. 90)")
-        if (lon1 > 180 or lon1 < -180) or (lon2 > 180 or lon2 < -180):
-            raise LongitudeRangeException("Longitude exceeds the range (-180 .. 180)")
-        
-        try:
-            lat1 = math.radians(lat1)
-            lat2 = math.radians(lat2)
-            lon1 = math.radians(lon1)
-            lon2 = math.radians(lon2)
-            
-            dLat = lat2 - lat1
-            dLon = math.fabs(lon2 - lon1)
-            
-            dPhi = math.log(math.tan(lat2/2 + math.pi/4)/math.tan(lat1/2 + math.pi/4))
-            #E-W line gives dPhi=0.
-            if math.isinf(dLat/dPhi):
-                q = math.cos(lat1)
-            else:
-                q = dLat/dPhi
-            
-            #If dLon over 180 take shorter rhumb across 180 meridian.
-            if math.fabs(dLon) > math.pi:
-                if dLon > 0:
-                    dLon = -(2 * math.pi - dLon)
-                else:
-                    dLon = 2 * math.pi + dLon
-                    
-            dist = math.sqrt(math.pow(dLat, 2) + math.pow(q, 2) * math.pow(dLon, 2)) * R
-        except Exception as ex:
-            sys.stderr.write('ERROR: %s\n' % str(ex))
-            return 1 
-        
-        return dist
-    
+        self._validate_coords(lat1, lon1, lat2, lon2)
+
+        return _rhumb_distance(float(lat1), float(lon1), float(lat2), float(lon2))
+
     def rhumb_bearing(self, lat1, lon1, lat2, lon2):
         """ @brief Returns the bearing from this point to the supplied point along rhumb line, in degrees.
             @param {lat1/lon1} float: Coordinates of source point.
             @param {lat2/lon2} float: Coordinates of destination point.
             @return float: Bearing in degrees from North."""
-        if (lat1 > 90 or lat1 < -90) or (lat2 > 90 or lat2 < -90):
-            raise LatitudeRangeException("Latitude exceeds the range (-90 .. 90)")
-        if (lon1 > 180 or lon1 < -180) or (lon2 > 180 or lon2 < -180):
-            raise LongitudeRangeException("Longitude exceeds the range (-180 .. 180)")
-        
-        try:
-            lat1 = math.radians(lat1)
-            lat2 = math.radians(lat2)
-            lon1 = math.radians(lon1)
-            lon2 = math.radians(lon2)
-            
-            dLon = lon2 - lon1
-            dPhi = math.log(math.tan(lat2/2 + math.pi/4)/math.tan(lat1/2 + math.pi/4))
-            
-            #E-W line gives dPhi=0.
-            if math.fabs(dLon) > math.pi:
-                if dLon > 0:
-                    dLon = -(2 * math.pi - dLon)
-                else:
-                    dLon = 2 * math.pi + dLon
-            
-            brng = math.atan2(dLon, dPhi)
-        except Exception as ex:
-            sys.stderr.write('ERROR: %s\n' % str(ex))
-            return 1
-        
-        return (math.degrees(brng) + 360) % 360
-    
+        self._validate_coords(lat1, lon1, lat2, lon2)
+
+        return _rhumb_bearing(float(lat1), float(lon1), float(lat2), float(lon2))
+
     def rhumb_destination_point(self, lat1, lon1, brng, dist):
         """ @brief Returns the destination point from this point having traveled the given
             distance (in km) on the given bearing along a rhumb line.
             @param lat1/lon1 float: Latitude/longitude of source point.
             @param brng float: Bearing in degrees from North.
             @param dist float: Distance in km.
-            @return {Lat/Lon} float Destination point."""        
-        R = 6371.0
-        
-        if lat1 > 90 or lat1 < -90: 
-            raise LatitudeRangeException("Latitude exceeds the range (-90 .. 90)")
-        if lon1 > 180 or lon1 < -180:
-            raise LongitudeRangeException("Longitude exceeds the range (-180 .. 180)")
-        
-        try:
-            #Angular distance covered on earth's surface.
-            d = float(dist)/R
-            lat1 = math.radians(lat1)
-            lon1 = math.radians(lon1)
-            brng = math.radians(brng)
-            
-            lat2 = lat1 + d * math.cos(brng)
-            dLat = lat2 - lat1
-    
-            dPhi = math.log(math.tan(lat2/2 + math.pi/4)/math.tan(lat1/2 + math.pi/4))
-            
-            #E-W line gives dPhi=0.
-            if math.isinf(dLat/dPhi):
-                q = math.cos(lat1)
-            else:
-                q = dLat/dPhi
-                
-            dLon = d * math.sin(brng)/q
-            if math.fabs(lat2) > math.pi/2.0:
-                if lat2 > 0:
-                    lat2 = math.pi - lat2
-                else:
-                    lat2 = -math.pi - lat2
-            
-            lon2 = (lon1 + dLon + 3 * math.pi) % (2 * math.pi) - math.pi
-        except Exception as ex:
-            sys.stderr.write('ERROR: %s\n' % str(ex))
-            return 1
-        return [math.degrees(lat2), math.degrees(lon2)]
-    
+            @return {Lat/Lon} tuple: Destination point."""
+        self._validate_coords(lat1, lon1)
+
+        return _rhumb_destination_point(float(lat1), float(lon1), float(brng), float(dist))
+
     def rhumb_midpoint(self, lat1, lon1, lat2, lon2):
-        """ @brief Returns the loxodromic midpoint (along a rhumb line) between 
+        """ @brief Returns the loxodromic midpoint (along a rhumb line) between
             this point and the supplied point.
             @param {lat1/lon1} float: Source point.
             @param {lat2/lon2} float: Destination point.
-            @return {Lat/Lon} float: Midpoint between this point and the supplied point."""
-            
-        if lat1 > 90 or lat1 < -90: 
-            raise LatitudeRangeException("Latitude exceeds the range (-90 .. 90)")
-        if lon1 > 180 or lon1 < -180:
-            raise LongitudeRangeException("Longitude exceeds the range (-180 .. 180)")
-        
-        try:
-            lat1 = math.radians(lat1)
-            lat2 = math.radians(lat2)
-            lon1 = math.radians(lon1)
-            lon2 = math.radians(lon2)
-            
-            lat3 = (lat2 + lat1)/2.0
-            f1 = math.tan(math.pi/4.0 + lat1/2.0)
-            f2 = math.tan(math.pi/4.0 + lat2/2.0)
-            f3 = math.tan(math.pi/4.0 + lat3/2.0)
-            
-            lon3 = ((lon2 - lon1) * math.log(f3) + lon1 * math.log(f2) - lon2 * \
-                    math.log(f1)) / math.log(f2/f1)
-                    
-            if math.isnan(lon3):
-                lon3 = (lon1 + lon2)/2.0
-                
-            #Normalize to -180 .. 180.
-            lon3 = (lon3 + 3 * math.pi) % (2 * math.pi) - math.pi
-        except Exception as ex:
-            sys.stderr.write('ERROR: %s\n' % str(ex))
-            return 1
-        
-        return [math.degrees(lat3), math.degrees(lon3)]
-    
+            @return {Lat/Lon} tuple: Midpoint between this point and the supplied point."""
+
+        self._validate_coords(lat1, lon1, lat2, lon2)
+
+        return _rhumb_midpoint(float(lat1), float(lon1), float(lat2), float(lon2))
+
     def destination_point(self, lat1, lon1, brng, dist):
         """ @brief Returns the destination point from source point.
             @param {lat1/lon1} float: Latitude/Longitude of source point.
             @param brng float: Initial bearing in degrees.
             @param dist float: Distance in km.
-            @return {lat2/lon2} float: Destination point."""
-        R = 6371.0
-        
-        if lat1 > 90 or lat1 < -90: 
-            raise LatitudeRangeException("Latitude exceeds the range (-90 .. 90)")
-        if lon1 > 180 or lon1 < -180:
-            raise LongitudeRangeException("Longitude exceeds the range (-180 .. 180)")
-        
+            @return {lat2/lon2} tuple: Destination point."""
+        self._validate_coords(lat1, lon1)
+
+        return _destination_point(float(lat1), float(lon1), float(brng), float(dist))
+
+def _require_numpy():
+    """Raises ImportError when NumPy, needed by the batch functions, is missing."""
+    if np is None:
+        raise ImportError("NumPy is required for the batch (array) functions")
+
+def _validate_vec(lat, lon):
+    """ @brief Range check of coordinate arrays used by the batch functions.
+        @param lat ndarray: Latitudes in degrees.
+        @param lon ndarray: Longitudes in degrees."""
+    #Written as negated ranges so NaN fails the check too, like in Geo._validate_coords().
+    if np.any(~((lat >= -90) & (lat <= 90))):
+        raise LatitudeRangeException("Latitude exceeds the range (-90 .. 90)")
+    if np.any(~((lon >= -180) & (lon <= 180))):
+        raise LongitudeRangeException("Longitude exceeds the range (-180 .. 180)")
+
+#Odd degree 9 polynomial sin(x) ~ x*(S1 + x^2*(S3 + x^2*(S5 + x^2*(S7 + x^2*S9)))),
+#fitted for minimal relative error on [-pi/2, pi/2] (below 7e-9).
+_S1 = 0.9999999957376579
+_S3 = -0.1666665799454943
+_S5 = 0.008333051101992887
+_S7 = -0.0001980907737766485
+_S9 = 2.6052286782224915e-06
+
+def _approx_sin(x):
+    """ @brief Polynomial approximation of numpy.sin() for angles in [-pi/2, pi/2].
+        @param x ndarray: Angles in radians, not range reduced here.
+        @return ndarray Approximated sines."""
+    x2 = x * x
+    return x * (_S1 + x2 * (_S3 + x2 * (_S5 + x2 * (_S7 + x2 * _S9))))
+
+def distance_haversine_vec(lat1, lon1, lat2, lon2, R=_R, approx=False):
+    """ @brief Compute distances in km between arrays of points using haversine formula.
+        Inputs are broadcast against each other, so a single source point can be
+        passed with arrays of destination points.
+        @param {lat1/lon1} array_like: Source points.
+        @param {lat2/lon2} array_like: Destination points.
+        @param R float: Earth radius in km.
+        @param approx bool: Use a polynomial sin/cos instead of NumPy's. Faster, with
+            relative error around 1e-8, but close to antipodal points (where haversine
+            is ill-conditioned) the error grows to about a hundred meters.
+        @return ndarray Distances between source and destination points. """
+    _require_numpy()
+    lat1 = np.asarray(lat1, dtype=np.float64)
+    lon1 = np.asarray(lon1, dtype=np.float64)
+    lat2 = np.asarray(lat2, dtype=np.float64)
+    lon2 = np.asarray(lon2, dtype=np.float64)
+    _validate_vec(lat1, lon1)
+    _validate_vec(lat2, lon2)
+    
+    phi1 = np.radians(lat1)
+    phi2 = np.radians(lat2)
+    dphi = phi2 - phi1
+    dl = np.radians(lon2 - lon1)
+    
+    if approx:
+        #sin^2(dl/2) has a period of 2*pi, so dl can be wrapped into [-pi, pi]
+        #to keep all arguments of _approx_sin() within [-pi/2, pi/2].
+        dl = _wrap_pi_vec(dl)
+        sLat = _approx_sin(dphi * 0.5)
+        sLon = _approx_sin(dl * 0.5)
+        cc = _approx_sin(_PI_2 - np.abs(phi1)) * _approx_sin(_PI_2 - np.abs(phi2))
+        a = sLat * sLat + cc * sLon * sLon
+    else:
+        sLat = np.sin(dphi * 0.5)
+        sLon = np.sin(dl * 0.5)
+        a = sLat * sLat + np.cos(phi1) * np.cos(phi2) * sLon * sLon
+    #Rounding (or the approximation error) may push a slightly above 1.
+    return R * 2 * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+def distance_sloc_vec(lat1, lon1, lat2, lon2, R=_R):
+    """ @brief Compute distances in km between arrays of points using
+        spherical law of cosines formula (atan2 form, see Geo.distance_sloc()).
+        @param {lat1/lon1} array_like: Source points.
+        @param {lat2/lon2} array_like: Destination points.
+        @param R float: Earth radius in km.
+        @return ndarray Distances between source and destination points. """
+    _require_numpy()
+    lat1 = np.asarray(lat1, dtype=np.float64)
+    lon1 = np.asarray(lon1, dtype=np.float64)
+    lat2 = np.asarray(lat2, dtype=np.float64)
+    lon2 = np.asarray(lon2, dtype=np.float64)
+    _validate_vec(lat1, lon1)
+    _validate_vec(lat2, lon2)
+    
+    phi1 = np.radians(lat1)
+    phi2 = np.radians(lat2)
+    dl = np.radians(lon2 - lon1)
+    sp1 = np.sin(phi1)
+    cp1 = np.cos(phi1)
+    sp2 = np.sin(phi2)
+    cp2 = np.cos(phi2)
+    cdl = np.cos(dl)
+    
+    #atan2 form, see _sloc().
+    a = cp2 * np.sin(dl)
+    b = cp1 * sp2 - sp1 * cp2 * cdl
+    c = sp1 * sp2 + cp1 * cp2 * cdl
+    return R * np.arctan2(np.sqrt(a * a + b * b), c)
+
+def _fallback_backend(backend):
+    """ @brief Warns that an optional backend is missing and returns the one to use instead.
+        @param backend str: Name of the missing backend.
+        @return str 'numpy'."""
+    warnings.warn("%s backend is not available, using numpy instead" % backend, RuntimeWarning,
+                  stacklevel=3)
+    return 'numpy'
+
+def distance_haversine_batch(lat1, lon1, lat2, lon2, backend='numpy'):
+    """ @brief Compute distances in km between arrays of points on a sphere with
+        a selectable implementation. A backend whose package is not installed
+        falls back to 'numpy' with a RuntimeWarning.
+        @param {lat1/lon1} array_like: Source points.
+        @param {lat2/lon2} array_like: Destination points.
+        @param backend str: 'numpy' (distance_haversine_vec()), 'numba'
+            (Geo.distance_haversine_parallel()), 'cython' (compiled _geo_c module)
+            or 'pyproj' (PROJ's geodesic on a sphere of the same radius).
+        @return ndarray Distances between source and destination points. """
+    _require_numpy()
+    if backend not in ('numpy', 'numba', 'cython', 'pyproj'):
+        raise ValueError("Unknown backend: %s" % backend)
+    if backend == 'numba' and njit is None:
+        backend = _fallback_backend(backend)
+    elif backend == 'cython' and _geo_c is None:
+        backend = _fallback_backend(backend)
+    elif backend == 'pyproj':
         try:
-            #Convert distance to angular distance in radians.
-            dist = dist/R 
-            lat1 = math.radians(lat1)
-            lon1 = math.radians(lon1)
-            brng = math.radians(brng)
-            
-            lat2 = math.asin(math.sin(lat1) * math.cos(dist) + math.cos(lat1) * \
-                             math.sin(dist) * math.cos(brng))
-            lon2 = lon1 + math.atan2(math.sin(brng) * math.sin(dist) * math.cos(lat1), \
-                                     math.cos(dist) - math.sin(lat1) * math.sin(lat2))
-            #Normalize to -180 .. 180.
-            lon2 = (lon2 + 3* math.pi) % (2 * math.pi) - math.pi
-        except Exception as ex:
-            sys.stderr.write('ERROR: %s\n' % str(ex))
-            return 1
-        
-        return [math.degrees(lat2), math.degrees(lon2)]
+            from pyproj import Geod
+        except ImportError:
+            backend = _fallback_backend(backend)
+    
+    if backend == 'numpy':
+        return distance_haversine_vec(lat1, lon1, lat2, lon2)
+    if backend == 'numba':
+        return Geo.distance_haversine_parallel(lat1, lon1, lat2, lon2)
+    
+    lat1, lon1, lat2, lon2 = np.broadcast_arrays(*[np.asarray(v, dtype=np.float64) \
+                                                   for v in (lat1, lon1, lat2, lon2)])
+    _validate_vec(lat1, lon1)
+    _validate_vec(lat2, lon2)
+    
+    if backend == 'cython':
+        out = np.empty(lat1.shape)
+        _geo_c.haversine_batch(np.ravel(lat1), np.ravel(lon1), np.ravel(lat2), np.ravel(lon2), \
+                               out.reshape(-1))
+        return out[()]
+    
+    #Geodesic on a sphere is the great circle, pyproj works in meters.
+    geod = Geod(a=_R * 1000.0, b=_R * 1000.0)
+    _, _, dist = geod.inv(lon1, lat1, lon2, lat2)
+    return np.asarray(dist) / 1000.0
+
+def initial_bearing_vec(lat1, lon1, lat2, lon2, backend='numpy'):
+    """ @brief Compute initial bearings in degrees (0-360) between arrays of points.
+        A backend whose package is not installed falls back to 'numpy' with a RuntimeWarning.
+        @param {lat1/lon1} array_like: Source points.
+        @param {lat2/lon2} array_like: Destination points.
+        @param backend str: 'numpy' or 'cython' (compiled _geo_c module).
+        @return ndarray Bearings in degrees from North. """
+    _require_numpy()
+    if backend not in ('numpy', 'cython'):
+        raise ValueError("Unknown backend: %s" % backend)
+    if backend == 'cython' and _geo_c is None:
+        backend = _fallback_backend(backend)
+    
+    lat1, lon1, lat2, lon2 = np.broadcast_arrays(*[np.asarray(v, dtype=np.float64) \
+                                                   for v in (lat1, lon1, lat2, lon2)])
+    _validate_vec(lat1, lon1)
+    _validate_vec(lat2, lon2)
+    
+    if backend == 'cython':
+        out = np.empty(lat1.shape)
+        _geo_c.initial_bearing_batch(np.ravel(lat1), np.ravel(lon1), np.ravel(lat2), np.ravel(lon2), \
+                                     out.reshape(-1))
+        return out[()]
+    
+    #Same formula as _fwd_az().
+    phi1 = np.radians(lat1)
+    phi2 = np.radians(lat2)
+    dl = np.radians(lon2 - lon1)
+    cp2 = np.cos(phi2)
+    y = np.sin(dl) * cp2
+    x = np.cos(phi1) * np.sin(phi2) - np.sin(phi1) * cp2 * np.cos(dl)
+    return ((np.degrees(np.arctan2(y, x)) + 360) % 360)[()]
+
+def pairwise_haversine(lats1, lons1, lats2, lons2, R=_R, block=1024, backend='numpy'):
+    """ @brief Compute the matrix of haversine distances in km between every point
+        of the first set and every point of the second set (like scipy's cdist).
+        @param {lats1/lons1} array_like: N source points.
+        @param {lats2/lons2} array_like: M destination points.
+        @param R float: Earth radius in km.
+        @param block int: Number of source rows computed at once, keeps
+            the temporaries small for large N.
+        @param backend str: 'numpy' or 'sklearn' (sklearn's haversine_distances);
+            'sklearn' falls back to 'numpy' with a RuntimeWarning when missing.
+        @return ndarray (N, M) matrix of distances. """
+    _require_numpy()
+    if backend not in ('numpy', 'sklearn'):
+        raise ValueError("Unknown backend: %s" % backend)
+    if block < 1:
+        raise ValueError("block must be at least 1")
+    lats1 = np.asarray(lats1, dtype=np.float64).ravel()
+    lons1 = np.asarray(lons1, dtype=np.float64).ravel()
+    lats2 = np.asarray(lats2, dtype=np.float64).ravel()
+    lons2 = np.asarray(lons2, dtype=np.float64).ravel()
+    _validate_vec(lats1, lons1)
+    _validate_vec(lats2, lons2)
+    
+    if backend == 'sklearn':
+        try:
+            from sklearn.metrics.pairwise import haversine_distances
+        except ImportError:
+            backend = _fallback_backend(backend)
+        else:
+            return haversine_distances(np.radians(np.column_stack((lats1, lons1))), \
+                                       np.radians(np.column_stack((lats2, lons2)))) * R
+    
+    #Convert to radians once, not for every pair.
+    p1 = np.radians(lats1)
+    l1 = np.radians(lons1)
+    p2 = np.radians(lats2)
+    l2 = np.radians(lons2)
+    cp1 = np.cos(p1)
+    cp2 = np.cos(p2)
+    
+    D = np.empty((p1.size, p2.size))
+    for i in range(0, p1.size, block):
+        j = i + block
+        dphi = p2[None, :] - p1[i:j, None]
+        dl = l2[None, :] - l1[i:j, None]
+        sLat = np.sin(dphi * 0.5)
+        sLon = np.sin(dl * 0.5)
+        a = np.minimum(sLat * sLat + cp1[i:j, None] * cp2[None, :] * sLon * sLon, 1.0)
+        D[i:j] = 2 * R * np.arcsin(np.sqrt(a))
+    return D
+
+def midpoint_vec(lat1, lon1, lat2, lon2):
+    """ @brief Half-way points along great circle paths between arrays of points.
+        @param {lat1/lon1} array_like: Source points.
+        @param {lat2/lon2} array_like: Destination points.
+        @return (lats, lons) ndarray: Midpoint latitudes and longitudes, not rounded."""
+    _require_numpy()
+    lat1 = np.asarray(lat1, dtype=np.float64)
+    lon1 = np.asarray(lon1, dtype=np.float64)
+    lat2 = np.asarray(lat2, dtype=np.float64)
+    lon2 = np.asarray(lon2, dtype=np.float64)
+    _validate_vec(lat1, lon1)
+    _validate_vec(lat2, lon2)
+    
+    phi1 = np.radians(lat1)
+    phi2 = np.radians(lat2)
+    l1 = np.radians(lon1)
+    dl = np.radians(lon2) - l1
+    
+    cp2 = np.cos(phi2)
+    bx = cp2 * np.cos(dl)
+    by = cp2 * np.sin(dl)
+    cx = np.cos(phi1) + bx
+    
+    mLat = np.arctan2(np.sin(phi1) + np.sin(phi2), np.sqrt(cx * cx + by * by))
+    mLon = l1 + np.arctan2(by, cx)
+    return np.degrees(mLat)[()], np.degrees(mLon)[()]
+
+def destination_point_vec(lat1, lon1, brng, dist):
+    """ @brief Destination points along great circles from arrays of source points.
+        @param {lat1/lon1} array_like: Source points.
+        @param brng array_like: Initial bearings in degrees.
+        @param dist array_like: Distances in km.
+        @return (lats, lons) ndarray: Destination points."""
+    _require_numpy()
+    lat1 = np.asarray(lat1, dtype=np.float64)
+    lon1 = np.asarray(lon1, dtype=np.float64)
+    _validate_vec(lat1, lon1)
+    
+    d = np.asarray(dist, dtype=np.float64) * _INV_R
+    phi1 = np.radians(lat1)
+    l1 = np.radians(lon1)
+    theta = np.radians(brng)
+    
+    sp1 = np.sin(phi1)
+    cp1 = np.cos(phi1)
+    sd = np.sin(d)
+    cd = np.cos(d)
+    
+    phi2 = np.arcsin(sp1 * cd + cp1 * sd * np.cos(theta))
+    #Normalize to -180 .. 180.
+    l2 = _wrap_pi_vec(l1 + np.arctan2(np.sin(theta) * sd * cp1, cd - sp1 * np.sin(phi2)))
+    return np.degrees(phi2)[()], np.degrees(l2)[()]
+
+def rhumb_destination_point_vec(lat1, lon1, brng, dist):
+    """ @brief Destination points along rhumb lines from arrays of source points.
+        Raises ValueError when a path reaches or crosses a pole, like
+        Geo.rhumb_destination_point() does.
+        @param {lat1/lon1} array_like: Source points.
+        @param brng array_like: Bearings in degrees from North.
+        @param dist array_like: Distances in km.
+        @return (lats, lons) ndarray: Destination points."""
+    _require_numpy()
+    lat1 = np.asarray(lat1, dtype=np.float64)
+    lon1 = np.asarray(lon1, dtype=np.float64)
+    _validate_vec(lat1, lon1)
+    
+    d = np.asarray(dist, dtype=np.float64) * _INV_R
+    phi1 = np.radians(lat1)
+    l1 = np.radians(lon1)
+    theta = np.radians(brng)
+    
+    phi2 = phi1 + d * np.cos(theta)
+    dLat = phi2 - phi1
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratio = np.tan(phi2 * 0.5 + _PI_4) / np.tan(phi1 * 0.5 + _PI_4)
+    #Past a pole the ratio is negative, see _positive().
+    if np.any(~(ratio > 0.0)):
+        raise ValueError("math domain error")
+    dPhi = np.log(ratio)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        #E-W line gives dPhi=0.
+        q = np.where(dPhi == 0.0, np.cos(phi1), dLat / dPhi)
+    dLon = d * np.sin(theta) / q
+    
+    l2 = _wrap_pi_vec(l1 + dLon)
+    return np.degrees(phi2)[()], np.degrees(l2)[()]
+
+def intersection_vec(lat1, lon1, brng1, lat2, lon2, brng2):
+    """ @brief Intersections of pairs of paths given start points and bearings.
+        @param {lat1/lon1} array_like: First start points.
+        @param brng1 array_like: Initial bearings from the first points.
+        @param {lat2/lon2} array_like: Second start points.
+        @param brng2 array_like: Initial bearings from the second points.
+        @return (lats, lons) ndarray: Intersection points, NaN where there is
+            no unique intersection, like Geo.intersection()."""
+    _require_numpy()
+    lat1 = np.asarray(lat1, dtype=np.float64)
+    lon1 = np.asarray(lon1, dtype=np.float64)
+    lat2 = np.asarray(lat2, dtype=np.float64)
+    lon2 = np.asarray(lon2, dtype=np.float64)
+    _validate_vec(lat1, lon1)
+    _validate_vec(lat2, lon2)
+    
+    phi1 = np.radians(lat1)
+    l1 = np.radians(lon1)
+    phi2 = np.radians(lat2)
+    l2 = np.radians(lon2)
+    t1 = np.radians(brng1)
+    t2 = np.radians(brng2)
+    
+    sp1 = np.sin(phi1)
+    cp1 = np.cos(phi1)
+    sp2 = np.sin(phi2)
+    cp2 = np.cos(phi2)
+    
+    sLat = np.sin((phi2 - phi1) * 0.5)
+    sLon = np.sin((l2 - l1) * 0.5)
+    d = 2 * np.arcsin(np.sqrt(np.minimum(sLat * sLat + cp1 * cp2 * sLon * sLon, 1.0)))
+    sd = np.sin(d)
+    cd = np.cos(d)
+    
+    with np.errstate(divide='ignore', invalid='ignore'):
+        #Protect against rounding.
+        f1 = np.arccos(np.clip((sp2 - sp1 * cd) / (sd * cp1), -1.0, 1.0))
+        f2 = np.arccos((sp1 - sp2 * cd) / (sd * cp2))
+    
+        east = np.sin(l2 - l1) > 0
+        b1 = np.where(east, f1, _TWO_PI - f1)
+        b2 = np.where(east, _TWO_PI - f2, f2)
+    
+        a1 = _wrap_pi_vec(t1 - b1)
+        a2 = _wrap_pi_vec(b2 - t2)
+        sa1 = np.sin(a1)
+        sa2 = np.sin(a2)
+        ca1 = np.cos(a1)
+        ca2 = np.cos(a2)
+    
+        a3 = np.arccos(-ca1 * ca2 + sa1 * sa2 * cd)
+        dx = np.arctan2(sd * sa1 * sa2, ca2 + ca1 * np.cos(a3))
+        sdx = np.sin(dx)
+        cdx = np.cos(dx)
+    
+        phi3 = np.arcsin(sp1 * cdx + cp1 * sdx * np.cos(t1))
+        dLon13 = np.arctan2(np.sin(t1) * sdx * cp1, cdx - sp1 * np.sin(phi3))
+        l3 = _wrap_pi_vec(l1 + dLon13)
+    
+    #Same start point, infinite or ambiguous intersection.
+    none = (d == 0) | ((sa1 == 0) & (sa2 == 0)) | (sa1 * sa2 < 0)
+    #[()] gives NumPy scalars for scalar inputs, like the other batch functions.
+    return np.where(none, np.nan, np.degrees(phi3))[()], np.where(none, np.nan, np.degrees(l3))[()]
         
 if __name__ == '__main__':
     #Simple using tests
@@ -449,4 +961,13 @@ if __name__ == '__main__':
     print(g.rhumb_destination_point(51.0732, 1.2017, 116.3810, 40.23))
     print(g.rhumb_midpoint(50.2150, 4.0925, 42.2104, 71.0227))
     print(g.destination_point(53.1914, 1.4347, 96.0118, 124.8))
+    if np is not None:
+        print(distance_haversine_vec(53.123, 21.020, [54.520, 52.259], [18.530, 21.020]))
+        print(distance_sloc_vec(52.259, 21.020, [54.520, 53.123], [18.530, 21.020]))
+        print(Geo.distance_haversine_ufunc(53.123, 21.020, [54.520, 52.259], [18.530, 21.020]))
+        print(Geo.distance_haversine_parallel(53.123, 21.020, [54.520, 52.259], [18.530, 21.020]))
+        print(pairwise_haversine([53.123, 52.259], [21.020, 21.020], [54.520, 50.0359], [18.530, 5.4255]))
+        print(midpoint_vec(34.122222, 118.4111111, [40.66972222, 50.0359], [73.94388889, 5.4255]))
+        print(intersection_vec(51.885, 0.235, 108.63, [49.008, 51.885], [2.549, 0.235], 32.72))
+        print(initial_bearing_vec(50.0359, 5.4255, [58.38, 50.0359], [3.042, 0.0]))
     
\ No newline at end of file
@@ -0,0 +1,43 @@
+'''
+Build of the optional compiled kernels (_geo_c), see pyproject.toml for the metadata.
+The extension is optional, when it fails to build geo.py uses its other backends.
+'''
+import os
+import tempfile
+from setuptools.errors import CompileError
+from setuptools import setup, Extension
+from setuptools.command.build_ext import build_ext
+from Cython.Build import cythonize
+
+def _accepts(compiler, flag):
+    """ @brief Checks whether the compiler accepts a flag by compiling an empty program.
+        @param compiler CCompiler: Compiler of the build.
+        @param flag str: Compiler flag.
+        @return bool True when the flag compiles."""
+    with tempfile.TemporaryDirectory() as tmp:
+        src = os.path.join(tmp, 'flag.c')
+        with open(src, 'w') as f:
+            f.write('int main(void) { return 0; }\n')
+        try:
+            compiler.compile([src], output_dir=tmp, extra_postargs=[flag])
+        except CompileError:
+            return False
+    return True
+
+class BuildExt(build_ext):
+    """Adds optimization flags on unix compilers (GCC or clang) and OpenMP where the
+       compiler supports it. Apple clang has no OpenMP without libomp, the prange loops
+       of _geo_c then run on a single thread."""
+    def build_extensions(self):
+        if self.compiler.compiler_type == 'unix':
+            openmp = _accepts(self.compiler, '-fopenmp')
+            for ext in self.extensions:
+                ext.extra_compile_args += ["-O3", "-ffast-math"]
+                ext.libraries += ["m"]
+                if openmp:
+                    ext.extra_compile_args += ["-fopenmp"]
+                    ext.extra_link_args += ["-fopenmp"]
+        build_ext.build_extensions(self)
+
+setup(ext_modules=cythonize([Extension("_geo_c", ["_geo_c.pyx"], optional=True)]),
+      cmdclass={'build_ext': BuildExt})